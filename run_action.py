@@ -3,8 +3,9 @@
 """Runner of the 'pull request comments from Clang-Tidy reports' action"""
 
 import argparse
-import difflib
-import json
+import bisect
+import concurrent.futures
+import functools
 import os
 import posixpath
 import re
@@ -14,6 +15,27 @@ import time
 import requests
 import yaml
 
+# Use the much faster libyaml-based loader if PyYAML has been built with it
+try:
+    from yaml import CSafeLoader as YamlSafeLoader
+except ImportError:
+    from yaml import SafeLoader as YamlSafeLoader
+
+# Matches the hunk headers of a patch, e.g. '@@ -101,8 +102,11 @@'
+HUNK_HEADER_REGEX = re.compile(r"^@@ -.*? +.*? @@", re.MULTILINE)
+
+# Matches a symbol quoted in a Clang-Tidy message
+QUOTED_SYMBOL_REGEX = re.compile("'([^']*)'")
+
+# Characters that have a special meaning in markdown
+MARKDOWN_CHARS = "\\`*_{}[]<>()#+-.!|"
+
+# Translation table that escapes the markdown characters
+MARKDOWN_ESCAPE_TABLE = str.maketrans({ch: "\\" + ch for ch in MARKDOWN_CHARS})
+
+# Matches an escaped markdown character
+ESCAPED_MARKDOWN_CHAR_REGEX = re.compile(r"\\([" + re.escape(MARKDOWN_CHARS) + "])")
+
 
 def get_diff_line_ranges_per_file(pr_files):
     """Generates and returns a list of line ranges affected by the corresponding patch hunks for
@@ -41,7 +63,7 @@ def get_diff_line_ranges_per_file(pr_files):
         file_name = pr_file["filename"]
 
         # The result is something like ['@@ -101,8 +102,11 @@', '@@ -123,9 +127,7 @@']
-        git_line_tags = re.findall(r"^@@ -.*? +.*? @@", pr_file["patch"], re.MULTILINE)
+        git_line_tags = HUNK_HEADER_REGEX.findall(pr_file["patch"])
 
         # We need to get it to a state like this: ['102,11', '127,7']
         changes = [
@@ -56,56 +78,57 @@ def get_diff_line_ranges_per_file(pr_files):
     return result
 
 
-def get_pull_request_files(
-    github_api_url, github_token, github_api_timeout, repo, pull_request_id
-):
-    """Generator of GitHub metadata about files modified by the processed PR"""
+def get_paginated_items(url, session, github_api_timeout):
+    """Generator of items returned by the paginated GitHub REST API endpoint
 
-    # Request a maximum of 100 pages (3000 items)
-    for page in range(1, 101):
-        result = requests.get(
-            f"{github_api_url}/repos/{repo}/pulls/{pull_request_id:d}/files?page={page:d}",
-            headers={
-                "Accept": "application/vnd.github.v3+json",
-                "Authorization": f"token {github_token}",
-            },
-            timeout=github_api_timeout,
+    Pages are requested concurrently in batches, the iteration stops at the first empty page.
+    """
+
+    pages_per_batch = 4
+
+    def get_page(page):
+        result = session.get(
+            f"{url}?per_page=100&page={page:d}", timeout=github_api_timeout
         )
 
         assert result.status_code == requests.codes.ok  # pylint: disable=no-member
 
-        chunk = json.loads(result.text)
+        return result.json()
 
-        if not chunk:
-            break
+    with concurrent.futures.ThreadPoolExecutor(max_workers=pages_per_batch) as executor:
+        # Request a maximum of 100 pages of 100 items each (10000 items)
+        for first_page in range(1, 101, pages_per_batch):
+            for chunk in executor.map(
+                get_page, range(first_page, min(first_page + pages_per_batch, 101))
+            ):
+                if not chunk:
+                    return
 
-        yield from chunk
+                yield from chunk
 
 
-def get_pull_request_comments(
-    github_api_url, github_token, github_api_timeout, repo, pull_request_id
+def get_pull_request_files(
+    github_api_url, session, github_api_timeout, repo, pull_request_id
 ):
-    """Generator of GitHub metadata about comments to the processed PR"""
-
-    # Request a maximum of 100 pages (3000 items)
-    for page in range(1, 101):
-        result = requests.get(
-            f"{github_api_url}/repos/{repo}/pulls/{pull_request_id:d}/comments?page={page:d}",
-            headers={
-                "Accept": "application/vnd.github.v3+json",
-                "Authorization": f"token {github_token}",
-            },
-            timeout=github_api_timeout,
-        )
+    """Generator of GitHub metadata about files modified by the processed PR"""
 
-        assert result.status_code == requests.codes.ok  # pylint: disable=no-member
+    yield from get_paginated_items(
+        f"{github_api_url}/repos/{repo}/pulls/{pull_request_id:d}/files",
+        session,
+        github_api_timeout,
+    )
 
-        chunk = json.loads(result.text)
 
-        if not chunk:
-            break
+def get_pull_request_comments(
+    github_api_url, session, github_api_timeout, repo, pull_request_id
+):
+    """Generator of GitHub metadata about comments to the processed PR"""
 
-        yield from chunk
+    yield from get_paginated_items(
+        f"{github_api_url}/repos/{repo}/pulls/{pull_request_id:d}/comments",
+        session,
+        github_api_timeout,
+    )
 
 
 def generate_review_comments(
@@ -113,77 +136,153 @@ def generate_review_comments(
 ):  # pylint: disable=too-many-locals,too-many-branches,too-many-statements
     """Generator of the Clang-Tidy review comments"""
 
+    # The applicability of warnings is checked against contiguous line ranges, validate this once
+    # here instead of doing it on every check
+    assert all(
+        line_range.step == 1
+        for line_ranges in diff_line_ranges_per_file.values()
+        for line_range in line_ranges
+    )
+
+    # Contents of the source files and offsets of newline characters in them
+    source_files_cache = {}
+
+    def read_source_file(repository_root, file_path):
+        if file_path not in source_files_cache:
+            with open(repository_root + file_path, "rb") as file:
+                source_bytes = file.read()
+
+            # Search for newlines directly in the bytes to visit only the newline characters
+            # themselves instead of every character of the file
+            newline_offsets = []
+            offset = source_bytes.find(b"\n")
+            while offset != -1:
+                newline_offsets.append(offset)
+                offset = source_bytes.find(b"\n", offset + 1)
+
+            # Clang-Tidy doesn't support multibyte encodings and measures offsets in bytes
+            source_files_cache[file_path] = (
+                source_bytes.decode("latin_1"),
+                newline_offsets,
+            )
+
+        return source_files_cache[file_path]
+
     def get_line_by_offset(repository_root, file_path, offset):
-        # Clang-Tidy doesn't support multibyte encodings and measures offsets in bytes
-        with open(repository_root + file_path, encoding="latin_1") as file:
-            source_file = file.read()
+        _, newline_offsets = read_source_file(repository_root, file_path)
 
-        return source_file[:offset].count("\n") + 1
+        return bisect.bisect_left(newline_offsets, offset) + 1
+
+    def normalize_path(file_path):
+        # Strip only the leading repository root, Clang-Tidy may still report paths like
+        # "build/../src/file.cpp" relative to it, so normalize the rest as well
+        return posixpath.normpath(file_path.removeprefix(repository_root))
 
     def validate_warning_applicability(
         diff_line_ranges_per_file, file_path, start_line_num, end_line_num
     ):
-        assert end_line_num >= start_line_num
-
-        if file_path not in diff_line_ranges_per_file:
-            return False
-
-        for line_range in diff_line_ranges_per_file[file_path]:
-            assert line_range.step == 1
-
+        for line_range in diff_line_ranges_per_file.get(file_path, ()):
             if line_range.start <= start_line_num and end_line_num < line_range.stop:
                 return True
 
         return False
 
-    def calculate_replacements_diff(repository_root, file_path, replacements):
-        # Apply the replacements in reverse order so that subsequent offsets are not shifted
-        replacements.sort(key=lambda item: (-item["Offset"]))
+    # Yields (start line, end line, replacement text) tuples describing the sections of the
+    # file that should be replaced to apply the given replacements
+    def get_line_replacements(repository_root, file_path, replacements):
+        source_file, newline_offsets = read_source_file(repository_root, file_path)
 
-        # Clang-Tidy doesn't support multibyte encodings and measures offsets in bytes
-        with open(repository_root + file_path, encoding="latin_1") as file:
-            source_file = file.read()
+        def get_line_start_offset(line_num):
+            return newline_offsets[line_num - 2] + 1 if line_num > 1 else 0
 
-        changed_file = source_file
+        def get_line_end_offset(line_num):
+            if line_num > len(newline_offsets):
+                return len(source_file)
 
-        for replacement in replacements:
-            changed_file = (
-                changed_file[: replacement["Offset"]]
-                + replacement["ReplacementText"]
-                + changed_file[replacement["Offset"] + replacement["Length"] :]
+            return newline_offsets[line_num - 1] + 1
+
+        # A text inserted after the trailing newline character is attached to the last line
+        last_line_num = len(newline_offsets) + (not source_file.endswith("\n"))
+
+        # Group the replacements that affect the same or adjacent lines, each group is a list
+        # like [start line, end line, replacements]
+        replacement_groups = []
+
+        for replacement in sorted(replacements, key=lambda item: item["Offset"]):
+            replacement_end_offset = replacement["Offset"] + replacement["Length"]
+
+            start_line_num = min(
+                get_line_by_offset(repository_root, file_path, replacement["Offset"]),
+                last_line_num,
+            )
+            end_line_num = min(
+                get_line_by_offset(repository_root, file_path, replacement_end_offset),
+                last_line_num,
             )
 
-        # Create and return the diff between the original version of the file and the version
-        # with the applied replacements
-        return difflib.Differ().compare(
-            source_file.splitlines(keepends=True),
-            changed_file.splitlines(keepends=True),
-        )
+            # If the replaced section ends with a newline character that is kept by the
+            # replacement, then the line following this section is not affected
+            if (
+                end_line_num > start_line_num
+                and replacement_end_offset == get_line_start_offset(end_line_num)
+                and replacement["ReplacementText"].endswith("\n")
+            ):
+                end_line_num -= 1
 
-    def markdown(s):
-        md_chars = "\\`*_{}[]<>()#+-.!|"
+            if replacement_groups and start_line_num <= replacement_groups[-1][1] + 1:
+                replacement_groups[-1][1] = max(replacement_groups[-1][1], end_line_num)
+                replacement_groups[-1][2].append(replacement)
+            else:
+                replacement_groups.append([start_line_num, end_line_num, [replacement]])
 
-        def escape_chars(s):
-            for ch in md_chars:
-                s = s.replace(ch, "\\" + ch)
+        for start_line_num, end_line_num, group_replacements in replacement_groups:
+            section_start = get_line_start_offset(start_line_num)
+            section_end = get_line_end_offset(end_line_num)
 
-            return s
+            # Collect the untouched beginning of the first line, the replacement texts along
+            # with the untouched text between them and the untouched end of the last line
+            replacement_text_parts = []
+            unchanged_start = section_start
 
-        def unescape_chars(s):
-            for ch in md_chars:
-                s = s.replace("\\" + ch, ch)
+            for replacement in group_replacements:
+                replacement_text_parts.append(
+                    source_file[unchanged_start : replacement["Offset"]]
+                )
+                replacement_text_parts.append(replacement["ReplacementText"])
+
+                unchanged_start = replacement["Offset"] + replacement["Length"]
+
+            replacement_text_parts.append(source_file[unchanged_start:section_end])
+
+            replacement_text = "".join(replacement_text_parts)
 
-            return s
+            # The replacements do not actually change anything
+            if replacement_text == source_file[section_start:section_end]:
+                continue
+
+            yield start_line_num, end_line_num, replacement_text
+
+    def markdown(s):
+        def escape_chars(s):
+            return s.translate(MARKDOWN_ESCAPE_TABLE)
+
+        def unescape_chars(s):
+            return ESCAPED_MARKDOWN_CHAR_REGEX.sub(r"\1", s)
 
         # Escape markdown characters
         s = escape_chars(s)
         # Decorate quoted symbols as code
-        s = re.sub(
-            "'([^']*)'", lambda match: "`` " + unescape_chars(match.group(1)) + " ``", s
+        s = QUOTED_SYMBOL_REGEX.sub(
+            lambda match: "`` " + unescape_chars(match.group(1)) + " ``", s
         )
 
         return s
 
+    # The same diagnostic names are usually reported many times, so render each of them once
+    @functools.cache
+    def generate_comment_title(name, single_comment_marker):
+        return f"{single_comment_marker} **{markdown(name)}** {single_comment_marker}"
+
     def generate_single_comment(
         file_path,
         start_line_num,
@@ -197,7 +296,8 @@ def generate_review_comments(
             "path": file_path,
             "line": end_line_num,
             "side": "RIGHT",
-            "body": f"{single_comment_marker} **{markdown(name)}** {single_comment_marker}\n"
+            "body": generate_comment_title(name, single_comment_marker)
+            + "\n"
             + markdown(message),
         }
 
@@ -217,31 +317,24 @@ def generate_review_comments(
     for diag in clang_tidy_fixes[  # pylint: disable=too-many-nested-blocks
         "Diagnostics"
     ]:
-        # If we have a Clang-Tidy 8 format, then upconvert it to the Clang-Tidy 9+
-        if "DiagnosticMessage" not in diag:
-            diag["DiagnosticMessage"] = {
-                "FileOffset": diag["FileOffset"],
-                "FilePath": diag["FilePath"],
-                "Message": diag["Message"],
-                "Replacements": diag["Replacements"],
-            }
-
-        diag_message = diag["DiagnosticMessage"]
-
-        # Normalize paths
-        diag_message["FilePath"] = posixpath.normpath(
-            diag_message["FilePath"].replace(repository_root, "")
-        )
-        for replacement in diag_message["Replacements"]:
-            replacement["FilePath"] = posixpath.normpath(
-                replacement["FilePath"].replace(repository_root, "")
-            )
+        # If we have a Clang-Tidy 8 format, then the fields of the diagnostic message are
+        # stored directly in the diagnostic itself
+        diag_message = diag.get("DiagnosticMessage", diag)
 
         diag_name = diag["DiagnosticName"]
         diag_message_msg = diag_message["Message"]
 
         if not diag_message["Replacements"]:
-            file_path = diag_message["FilePath"]
+            file_path = normalize_path(diag_message["FilePath"])
+
+            # Files that are not modified by the PR cannot be commented on, don't even read them
+            if file_path not in diff_line_ranges_per_file:
+                print(
+                    # pylint: disable=line-too-long
+                    f"Skipping '{diag_name}' in {file_path}, this file is not modified in this PR"
+                )
+                continue
+
             offset = diag_message["FileOffset"]
             line_num = get_line_by_offset(repository_root, file_path, offset)
 
@@ -261,111 +354,30 @@ def generate_review_comments(
             else:
                 print("This warning does not apply to the lines changed in this PR")
         else:
-            diag_message_replacements = diag_message["Replacements"]
-
-            for file_path in {item["FilePath"] for item in diag_message_replacements}:
-                line_num = 1
-                start_line_num = None
-                end_line_num = None
-                replacement_text = None
-
-                for line in calculate_replacements_diff(
-                    repository_root,
-                    file_path,
-                    [
-                        item
-                        for item in diag_message_replacements
-                        if item["FilePath"] == file_path
-                    ],
+            # Group the replacements by file in a single pass
+            replacements_per_file = {}
+            for replacement in diag_message["Replacements"]:
+                replacements_per_file.setdefault(
+                    normalize_path(replacement["FilePath"]), []
+                ).append(replacement)
+
+            for file_path, file_replacements in replacements_per_file.items():
+                # Files that are not modified by the PR cannot be commented on, don't even read
+                # them
+                if file_path not in diff_line_ranges_per_file:
+                    print(
+                        # pylint: disable=line-too-long
+                        f"Skipping '{diag_name}' in {file_path}, this file is not modified in this PR"
+                    )
+                    continue
+
+                for (
+                    start_line_num,
+                    end_line_num,
+                    replacement_text,
+                ) in get_line_replacements(
+                    repository_root, file_path, file_replacements
                 ):
-                    # The comment line in the diff, ignore it
-                    if line.startswith("? "):
-                        continue
-
-                    # A string belonging only to the original version is the beginning or
-                    # continuation of the section of the file that should be replaced
-                    if line.startswith("- "):
-                        if start_line_num is None:
-                            assert end_line_num is None
-
-                            start_line_num = line_num
-                            end_line_num = line_num
-                        else:
-                            assert end_line_num is not None
-
-                            end_line_num = line_num
-
-                        if replacement_text is None:
-                            replacement_text = ""
-
-                        line_num += 1
-                    # A string belonging only to the modified version is part of the
-                    # replacement text
-                    elif line.startswith("+ "):
-                        if replacement_text is None:
-                            replacement_text = line[2:]
-                        else:
-                            replacement_text += line[2:]
-                    # A string belonging to both original and modified versions is the
-                    # end of the section to replace
-                    elif line.startswith("  "):
-                        if replacement_text is not None:
-                            # If there is a replacement text, but there is no information about
-                            # the section to replace, then this is not a replacement, but a pure
-                            # addition of text. Add the current line to the end of the replacement
-                            # text and "replace" it with the replacement text.
-                            if start_line_num is None:
-                                assert end_line_num is None
-
-                                start_line_num = line_num
-                                end_line_num = line_num
-                                replacement_text += line[2:]
-                            else:
-                                assert end_line_num is not None
-
-                            print(
-                                # pylint: disable=line-too-long
-                                f"Processing '{diag_name}' at lines {start_line_num:d}-{end_line_num:d} of {file_path}..."
-                            )
-
-                            if validate_warning_applicability(
-                                diff_line_ranges_per_file,
-                                file_path,
-                                start_line_num,
-                                end_line_num,
-                            ):
-                                yield generate_single_comment(
-                                    file_path,
-                                    start_line_num,
-                                    end_line_num,
-                                    diag_name,
-                                    diag_message_msg,
-                                    single_comment_marker=single_comment_marker,
-                                    replacement_text=replacement_text,
-                                )
-                            else:
-                                print(
-                                    "This warning does not apply to the lines changed in this PR"
-                                )
-
-                            start_line_num = None
-                            end_line_num = None
-                            replacement_text = None
-
-                        line_num += 1
-                    # Unknown prefix, this should not happen
-                    else:
-                        assert False, "Please report this to the repository maintainer"
-
-                # The end of the file is reached, but there is a section to replace
-                if replacement_text is not None:
-                    # Pure addition of text to the end of the file is not currently supported. If
-                    # you have an example of a Clang-Tidy replacement of this kind, please contact
-                    # the repository maintainer.
-                    assert (
-                        start_line_num is not None and end_line_num is not None
-                    ), "Please report this to the repository maintainer"
-
                     print(
                         # pylint: disable=line-too-long
                         f"Processing '{diag_name}' at lines {start_line_num:d}-{end_line_num:d} of {file_path}..."
@@ -392,9 +404,28 @@ def generate_review_comments(
                         )
 
 
+def wait_before_next_request(result):
+    """Pausing between the modifying GitHub API requests according to the rate limit headers of
+    the previous response"""
+
+    retry_after = int(result.headers.get("Retry-After", "0"))
+    rate_limit_remaining = int(result.headers.get("X-RateLimit-Remaining", "1"))
+
+    if retry_after > 0:
+        time.sleep(retry_after)
+    elif rate_limit_remaining == 0:
+        rate_limit_reset = int(result.headers.get("X-RateLimit-Reset", "0"))
+
+        time.sleep(max(rate_limit_reset - time.time(), 1))
+    else:
+        # GitHub recommends to wait at least one second between the modifying requests to avoid
+        # hitting the secondary rate limit
+        time.sleep(1)
+
+
 def post_review_comments(
     github_api_url,
-    github_token,
+    session,
     github_api_timeout,
     repo,
     pull_request_id,
@@ -411,30 +442,26 @@ def post_review_comments(
         for i in range(0, len(lst), n):
             yield lst[i : i + n]
 
+    total_reviews = (
+        len(review_comments) + suggestions_per_comment - 1
+    ) // suggestions_per_comment
+
     # Split the comments in chunks to avoid overloading the server
     # and getting 502 server errors as a response for large reviews
-    review_comments = list(split_into_chunks(review_comments, suggestions_per_comment))
-
-    total_reviews = len(review_comments)
-    current_review = 1
-
-    for comments_chunk in review_comments:
+    for current_review, comments_chunk in enumerate(
+        split_into_chunks(review_comments, suggestions_per_comment), 1
+    ):
         warning_comment = (
             warning_comment_prefix + f" ({current_review:d}/{total_reviews:d})"
         )
-        current_review += 1
 
-        result = requests.post(
+        result = session.post(
             f"{github_api_url}/repos/{repo}/pulls/{pull_request_id:d}/reviews",
             json={
                 "body": warning_comment,
                 "event": review_event,
                 "comments": comments_chunk,
             },
-            headers={
-                "Accept": "application/vnd.github.v3+json",
-                "Authorization": f"token {github_token}",
-            },
             timeout=github_api_timeout,
         )
 
@@ -445,12 +472,12 @@ def post_review_comments(
         ), f"Unexpected status code: {result.status_code:d}"
 
         # Avoid triggering abuse detection
-        time.sleep(10)
+        wait_before_next_request(result)
 
 
 def dismiss_change_requests(
     github_api_url,
-    github_token,
+    session,
     github_api_timeout,
     repo,
     pull_request_id,
@@ -462,18 +489,14 @@ def dismiss_change_requests(
 
     print("Checking if there are any stale requests for changes to dismiss...")
 
-    result = requests.get(
+    result = session.get(
         f"{github_api_url}/repos/{repo}/pulls/{pull_request_id:d}/reviews",
-        headers={
-            "Accept": "application/vnd.github.v3+json",
-            "Authorization": f"token {github_token}",
-        },
         timeout=github_api_timeout,
     )
 
     assert result.status_code == requests.codes.ok  # pylint: disable=no-member
 
-    reviews = json.loads(result.text)
+    reviews = result.json()
 
     # Dismiss only our own reviews
     reviews_to_dismiss = [
@@ -487,13 +510,9 @@ def dismiss_change_requests(
     for review_id in reviews_to_dismiss:
         print(f"Dismissing review {review_id:d}")
 
-        result = requests.put(
+        result = session.put(
             # pylint: disable=line-too-long
             f"{github_api_url}/repos/{repo}/pulls/{pull_request_id:d}/reviews/{review_id:d}/dismissals",
-            headers={
-                "Accept": "application/vnd.github.v3+json",
-                "Authorization": f"token {github_token}",
-            },
             json={
                 "message": "No Clang-Tidy warnings found so I assume my comments were addressed",
                 "event": "DISMISS",
@@ -504,11 +523,11 @@ def dismiss_change_requests(
         assert result.status_code == requests.codes.ok  # pylint: disable=no-member
 
         # Avoid triggering abuse detection
-        time.sleep(10)
+        wait_before_next_request(result)
 
     if auto_resolve_conversations:
         resolve_conversations(
-            github_token=github_token,
+            session=session,
             repo=repo,
             pull_request_id=pull_request_id,
             github_api_timeout=github_api_timeout,
@@ -517,7 +536,7 @@ def dismiss_change_requests(
 
 
 def conversation_threads_to_close(
-    repo, pr_number, github_token, github_api_timeout, single_comment_marker
+    repo, pr_number, session, github_api_timeout, single_comment_marker
 ):
     """Generator of unresolved conversation threads to close
 
@@ -527,11 +546,15 @@ def conversation_threads_to_close(
 
     repo_owner, repo_name = repo.split("/")
     query = """
-    query {
+    query($cursor: String) {
       repository(owner: "%s", name: "%s") {
         pullRequest(number: %d) {
           id
-          reviewThreads(last: 100) {
+          reviewThreads(first: 100, after: $cursor) {
+            pageInfo {
+              hasNextPage
+              endCursor
+            }
             nodes {
               id
               isResolved
@@ -555,61 +578,74 @@ def conversation_threads_to_close(
         pr_number,
     )
 
-    response = requests.post(
-        "https://api.github.com/graphql",
-        json={"query": query},
-        headers={"Authorization": "Bearer " + github_token},
-        timeout=github_api_timeout,
+    # a regex that matches the start of a single comment, leading whitespace is skipped by the
+    # regex itself so that the comment body does not have to be stripped first
+    single_comment_marker = re.escape(single_comment_marker)
+    comment_matcher = re.compile(
+        rf"\s*{single_comment_marker}.*{single_comment_marker}", re.DOTALL
     )
 
-    if response.status_code != 200:
-        print(
-            f"::error::getting unresolved conversation threads: {response.status_code}"
+    cursor = None
+
+    while True:
+        response = session.post(
+            "https://api.github.com/graphql",
+            json={"query": query, "variables": {"cursor": cursor}},
+            timeout=github_api_timeout,
         )
-        raise RuntimeError("Failed to get unresolved conversation threads.")
 
-    data = response.json()
-    # a regex that matches the start of a single comment
-    single_comment_marker = re.escape(single_comment_marker)
-    comment_matcher = re.compile(
-        f"^{single_comment_marker}.*{single_comment_marker}.*", re.DOTALL
-    )
+        if response.status_code != 200:
+            print(
+                f"::error::getting unresolved conversation threads: {response.status_code}"
+            )
+            raise RuntimeError("Failed to get unresolved conversation threads.")
+
+        data = response.json()
+        review_threads = data["data"]["repository"]["pullRequest"]["reviewThreads"]
+
+        # Iterate through review threads
+        for thread in review_threads["nodes"]:
+            for comment in thread["comments"]["nodes"]:
+                if (
+                    comment["id"]
+                    and thread["isResolved"] is False
+                    # this actor here is somehow different from `github-actions[bot]`
+                    # which we get through the Rest API
+                    and comment["author"]["login"] == "github-actions"
+                    and comment_matcher.match(comment["body"])
+                ):
+                    yield thread
+                    break
 
-    # Iterate through review threads
-    for thread in data["data"]["repository"]["pullRequest"]["reviewThreads"]["nodes"]:
-        for comment in thread["comments"]["nodes"]:
-            if (
-                comment["id"]
-                and thread["isResolved"] is False
-                # this actor here is somehow different from `github-actions[bot]`
-                # which we get through the Rest API
-                and comment["author"]["login"] == "github-actions"
-                and comment_matcher.match(comment["body"].strip())
-            ):
-                yield thread
-                break
+        if not review_threads["pageInfo"]["hasNextPage"]:
+            break
+
+        cursor = review_threads["pageInfo"]["endCursor"]
 
 
-def close_conversation(thread_id, github_token, github_api_timeout):
-    """Close a conversation thread using the GitHub GraphQL API"""
+def close_conversations(thread_ids, session, github_api_timeout):
+    """Close conversation threads with a single request using the GitHub GraphQL API"""
     mutation = (
-        """
-    mutation {
-      resolveReviewThread(input: {threadId: "%s", clientMutationId: "github-actions"}) {
-        thread {
+        "mutation {\n"
+        + "".join(
+            f"""
+      resolve{index:d}: resolveReviewThread(
+        input: {{threadId: "{thread_id}", clientMutationId: "github-actions"}}
+      ) {{
+        thread {{
           id
-        }
-      }
-    }
-    """
-        % thread_id
+        }}
+      }}
+"""
+            for index, thread_id in enumerate(thread_ids)
+        )
+        + "}\n"
     )
 
-    print(f"::debug::Closing conversation {thread_id}...")
-    response = requests.post(
+    print(f"::debug::Closing conversations {', '.join(thread_ids)}...")
+    response = session.post(
         "https://api.github.com/graphql",
         json={"query": mutation},
-        headers={"Authorization": "Bearer " + github_token},
         timeout=github_api_timeout,
     )
 
@@ -631,19 +667,27 @@ def close_conversation(thread_id, github_token, github_api_timeout):
             if "Resource not accessible by integration" in error_msg
             else f"Closing conversation query failed: {error_msg}"
         )
-    print("Conversation closed successfully.")
+    print(f"{len(thread_ids):d} conversation(s) closed successfully.")
 
 
 def resolve_conversations(
-    github_token, repo, pull_request_id, github_api_timeout, single_comment_marker
+    session, repo, pull_request_id, github_api_timeout, single_comment_marker
 ):
     """Resolving stale conversations"""
-    for thread in conversation_threads_to_close(
-        repo, pull_request_id, github_token, github_api_timeout, single_comment_marker
-    ):
-        close_conversation(
-            thread_id=thread["id"],
-            github_token=github_token,
+    thread_ids = [
+        thread["id"]
+        for thread in conversation_threads_to_close(
+            repo, pull_request_id, session, github_api_timeout, single_comment_marker
+        )
+    ]
+
+    # Close the conversations in chunks to keep the size of each GraphQL mutation reasonable
+    threads_per_mutation = 50
+
+    for i in range(0, len(thread_ids), threads_per_mutation):
+        close_conversations(
+            thread_ids=thread_ids[i : i + threads_per_mutation],
+            session=session,
             github_api_timeout=github_api_timeout,
         )
 
@@ -705,6 +749,15 @@ def main():
     github_api_url = os.environ.get("GITHUB_API_URL")
     github_api_timeout = 10
 
+    # Reuse the same connection for all the GitHub API requests
+    session = requests.Session()
+    session.headers.update(
+        {
+            "Accept": "application/vnd.github.v3+json",
+            "Authorization": f"token {github_token}",
+        }
+    )
+
     warning_comment_prefix = (
         ":warning: `Clang-Tidy` found issue(s) with the introduced code"
     )
@@ -713,7 +766,7 @@ def main():
     diff_line_ranges_per_file = get_diff_line_ranges_per_file(
         get_pull_request_files(
             github_api_url,
-            github_token,
+            session,
             github_api_timeout,
             args.repository,
             args.pull_request_id,
@@ -721,8 +774,11 @@ def main():
     )
 
     if os.path.isfile(args.clang_tidy_fixes):
-        with open(args.clang_tidy_fixes, encoding="utf_8") as file:
-            clang_tidy_fixes = yaml.safe_load(file)
+        # Let the YAML loader decode the file itself. The loader reads the file in small chunks,
+        # so the file is never held in memory as a whole and there is no need to mmap it (which
+        # would also fail for an empty file).
+        with open(args.clang_tidy_fixes, "rb") as file:
+            clang_tidy_fixes = yaml.load(file, Loader=YamlSafeLoader)
     else:
         print(
             f"Could not find the clang-tidy fixes file '{args.clang_tidy_fixes}',"
@@ -738,7 +794,7 @@ def main():
         print("No warnings found by Clang-Tidy")
         dismiss_change_requests(
             github_api_url,
-            github_token,
+            session,
             github_api_timeout,
             args.repository,
             args.pull_request_id,
@@ -760,7 +816,7 @@ def main():
     existing_pull_request_comments = list(
         get_pull_request_comments(
             github_api_url,
-            github_token,
+            session,
             github_api_timeout,
             args.repository,
             args.pull_request_id,
@@ -768,22 +824,21 @@ def main():
     )
 
     # Exclude already posted comments
-    for comment in existing_pull_request_comments:
-        review_comments = list(
-            filter(
-                lambda review_comment: not (
-                    review_comment["path"]
-                    == comment["path"]  # pylint: disable=cell-var-from-loop
-                    and review_comment["line"]
-                    == comment["line"]  # pylint: disable=cell-var-from-loop
-                    and review_comment["side"]
-                    == comment["side"]  # pylint: disable=cell-var-from-loop
-                    and review_comment["body"]
-                    == comment["body"]  # pylint: disable=cell-var-from-loop
-                ),
-                review_comments,
-            )
+    existing_comment_keys = {
+        (comment["path"], comment["line"], comment["side"], comment["body"])
+        for comment in existing_pull_request_comments
+    }
+    review_comments = [
+        review_comment
+        for review_comment in review_comments
+        if (
+            review_comment["path"],
+            review_comment["line"],
+            review_comment["side"],
+            review_comment["body"],
         )
+        not in existing_comment_keys
+    ]
 
     if not review_comments:
         print("No new warnings found by Clang-Tidy")
@@ -793,7 +848,7 @@ def main():
 
     post_review_comments(
         github_api_url,
-        github_token,
+        session,
         github_api_timeout,
         args.repository,
         args.pull_request_id,